@@ -4,7 +4,8 @@ import os
 import json
 from pathlib import Path
 from functools import lru_cache
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
 from dotenv import load_dotenv
 
@@ -22,8 +23,9 @@ class Settings:
         self.host: str = os.getenv("HOST", "0.0.0.0")
         self.port: int = int(os.getenv("PORT", "8080"))
         
-        # Load parts library
-        self.parts_library: Dict[str, Any] = self._load_parts_library()
+        # Load parts library; exposed read-only since the test service keys
+        # its precomputed indexes on the library object's identity
+        self.parts_library: Mapping[str, Any] = MappingProxyType(self._load_parts_library())
         
         # Load system prompts from config files
         self.system_prompt: str = self._load_system_prompt()
@@ -249,6 +249,16 @@ class QAReviewRequest(BaseModel):
     user_messages: List[str]
 
 
+class CombinedReviewRequest(BaseModel):
+    """Request body for the combined design review + QA review endpoint."""
+    views_url: str
+    current_code: str
+    test_results_summary: str
+    user_messages: List[str]
+    history: Optional[List[Message]] = None
+    system_prompt: Optional[str] = None
+
+
 class DownloadProjectRequest(BaseModel):
     """Request body for project download endpoint."""
     code: str
@@ -891,6 +901,49 @@ async def qa_review_stream(request: Request, qa_request: QAReviewRequest):
     
     return EventSourceResponse(generate())
 
+@app.post("/api/review-qa/stream")
+@limiter.limit("10/minute")
+async def review_and_qa_stream(request: Request, combined_request: CombinedReviewRequest):
+    """Stream the design review and QA review concurrently.
+
+    Starts both Gemini calls in the same wall-clock window and multiplexes
+    their chunks into a single SSE stream, tagging each event with its
+    source ('review' or 'qa') so the frontend can demultiplex.
+    """
+    gemini = get_gemini_service()
+    settings = get_settings()
+
+    # Extract filename from URL and load image
+    filename = combined_request.views_url.split('/')[-1]
+    image_path = SVG_DIR / filename
+
+    if not image_path.exists():
+        raise HTTPException(status_code=404, detail="Views image not found")
+
+    # Read image data
+    image_data = image_path.read_bytes()
+
+    # Convert history to dict format
+    history = []
+    if combined_request.history:
+        history = [{"role": msg.role, "content": msg.content} for msg in combined_request.history]
+
+    async def generate():
+        """Generate tagged SSE events from both Gemini streams."""
+        async for item in gemini.stream_review_and_qa(
+            image_data=image_data,
+            current_code=combined_request.current_code,
+            test_results_summary=combined_request.test_results_summary,
+            user_messages=combined_request.user_messages,
+            history=history,
+            system_prompt=combined_request.system_prompt,
+            qa_system_prompt=settings.qa_system_prompt,
+        ):
+            yield {"event": item["source"], "data": item["text"]}
+
+    return EventSourceResponse(generate())
+
+
 @app.post("/api/download-project")
 async def download_project(request: DownloadProjectRequest):
     """Generate a ZIP file containing all project assets."""
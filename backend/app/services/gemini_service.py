@@ -1,6 +1,8 @@
 """Gemini API service for streaming chat responses."""
 
+import asyncio
 import logging
+from collections import OrderedDict
 from typing import AsyncGenerator, List, Dict
 from google import genai
 from google.genai import types
@@ -12,6 +14,86 @@ logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+# Prompt templates are precompiled at module scope as bound .format callables
+# so each call only joins the variable segments instead of rebuilding the
+# whole template string (noticeable when current_code is large).
+# Maximum entries in the qa_agent prompt-wrapping cache
+_QA_WRAP_CACHE_SIZE = 256
+
+# Cap on concurrent Gemini streams; matches the httpx keepalive pool size so
+# a burst of requests reuses warm connections instead of opening new ones
+_MAX_CONCURRENT_STREAMS = 16
+
+# Review images larger than this many bytes are down-sampled before upload
+_IMAGE_DOWNSAMPLE_THRESHOLD = 256 * 1024
+
+# Maximum pixel dimensions for an uploaded review image
+_IMAGE_MAX_SIZE = (1024, 1024)
+
+
+def _downsample_image(image_data: bytes) -> tuple[bytes, str]:
+    """Down-sample a review image before uploading it to Gemini.
+
+    The model's image-token count and the upload time both scale with pixel
+    count, and the four-viewport grid carries more resolution than the
+    visual check needs. Images already under the size threshold are passed
+    through untouched.
+
+    Returns a tuple of (image bytes, mime type).
+    """
+    if len(image_data) <= _IMAGE_DOWNSAMPLE_THRESHOLD:
+        return image_data, "image/png"
+
+    try:
+        from io import BytesIO
+        from PIL import Image
+
+        image = Image.open(BytesIO(image_data))
+        image.thumbnail(_IMAGE_MAX_SIZE, Image.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        buf = BytesIO()
+        image.save(buf, "JPEG", quality=85)
+        return buf.getvalue(), "image/jpeg"
+    except Exception as e:
+        logger.warning(f"Failed to down-sample review image: {e}")
+        return image_data, "image/png"
+
+
+_QA_AGENT_WRAP_TMPL = """[QA AGENT REVIEW]
+The QA Agent has reviewed the design and provided the following feedback. Please address any issues and update the code accordingly. Keep in mind that the QA agent may hallucinate details, so verify all suggestions carefully.
+
+{content}
+
+[END QA AGENT REVIEW]""".format
+
+_REVIEW_PROMPT_TMPL = """I've rendered the current design. Here is an image showing four different perspectives.
+
+Current code:
+```python
+{code}
+```
+
+Please review the rendered image and consider:
+1. Does it match what was requested?
+2. Is the design assembleable and physically realizable?
+
+Keep your response brief - either confirm the design is good, or provide the corrected code.""".format
+
+_QA_PROMPT_TMPL = """Please review this woodworking assembly design.
+
+## User's Original Requests
+{user_context}
+
+## Test Suite Results
+{test_results_summary}
+
+## Rendered Design
+The image shows the current design from four different perspectives.
+
+Please provide your QA assessment following your review guidelines.""".format
+
+
 class GeminiService:
     """Service for interacting with the Google Gemini API."""
     
@@ -21,38 +103,92 @@ class GeminiService:
         self.designer_model = settings.gemini_designer_model
         self.qa_model = settings.gemini_qa_model
         self.system_prompt = settings.system_prompt
+        self._stream_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_STREAMS)
+        # Bounded cache of wrapped qa_agent messages; conversation prefixes
+        # repeat on every request, so the wrapping is a deterministic
+        # function of the content and worth caching
+        self._qa_wrap_cache: OrderedDict = OrderedDict()
     
+    @staticmethod
+    def _image_part(image_data: bytes) -> types.Part:
+        """Down-sample image bytes and wrap them as a Gemini Part.
+
+        The Pillow decode/encode and the SDK's bytes handling are CPU-bound,
+        so this is kept synchronous and callers run it off the event loop
+        via asyncio.to_thread to avoid stalling other concurrent streams.
+        """
+        image_bytes, image_mime = _downsample_image(image_data)
+        return types.Part.from_bytes(data=image_bytes, mime_type=image_mime)
+
+    @staticmethod
+    async def _close_stream(stream) -> None:
+        """Explicitly close a generate_content_stream iterator.
+
+        Closing the async iterator lets the genai SDK return the underlying
+        httpx connection to the keepalive pool immediately instead of waiting
+        for GC, avoiding a fresh TLS handshake on the next request.
+        """
+        aclose = getattr(stream, "aclose", None)
+        if aclose is None:
+            return
+        try:
+            await aclose()
+        except Exception:
+            pass
+
     def _build_contents(
-        self, 
-        message: str, 
-        history: List[Dict[str, str]]
+        self,
+        message: str,
+        history: List[Dict[str, str]],
+        collapse_history: bool = True,
     ) -> List[types.Content]:
         """Build Gemini contents from message and history.
-        
+
         Args:
             message: The current user message
             history: List of previous messages with 'role' and 'content' keys.
                      Supports 'user', 'model', and 'qa_agent' roles.
                      'qa_agent' messages are converted to user messages with special formatting.
-            
+            collapse_history: When True, fold all but the last two history
+                     turns into one synthetic user content block. Gemini pays
+                     per-message framing for every role turn, so collapsing
+                     long linear histories shortens time to first token.
+
         Returns:
             List of Gemini Content objects
         """
         contents = []
-        
-        # Add history
-        for msg in history:
+
+        # Collapse older history into a single context block, keeping the
+        # most recent turns verbatim so the model still sees fresh structure
+        recent = history
+        if collapse_history and len(history) > 2:
+            older, recent = history[:-2], history[-2:]
+            context_block = "\n\n".join(
+                f"[{msg['role']}] {msg['content']}" for msg in older
+            )
+            contents.append(
+                types.Content(
+                    role="user",
+                    parts=[types.Part.from_text(
+                        text=f"[CONVERSATION HISTORY]\n{context_block}\n[END CONVERSATION HISTORY]"
+                    )]
+                )
+            )
+
+        # Add recent history
+        for msg in recent:
             role = msg["role"]
             content = msg["content"]
             
             # Handle QA agent messages - convert to user message with QA prefix
             if role == "qa_agent":
-                qa_content = f"""[QA AGENT REVIEW]
-The QA Agent has reviewed the design and provided the following feedback. Please address any issues and update the code accordingly. Keep in mind that the QA agent may hallucinate details, so verify all suggestions carefully.
-
-{content}
-
-[END QA AGENT REVIEW]"""
+                qa_content = self._qa_wrap_cache.get(content)
+                if qa_content is None:
+                    qa_content = _QA_AGENT_WRAP_TMPL(content=content)
+                    self._qa_wrap_cache[content] = qa_content
+                    if len(self._qa_wrap_cache) > _QA_WRAP_CACHE_SIZE:
+                        self._qa_wrap_cache.popitem(last=False)
                 contents.append(
                     types.Content(
                         role="user",
@@ -101,22 +237,29 @@ The QA Agent has reviewed the design and provided the following feedback. Please
         # Use provided system prompt or fall back to default
         prompt_to_use = system_prompt if system_prompt is not None else self.system_prompt
         
-        try:
-            async for chunk in await self.client.aio.models.generate_content_stream(
-                model=self.designer_model,
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=prompt_to_use,
-                    temperature=0.0,
+        async with self._stream_semaphore:
+            try:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.designer_model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        system_instruction=prompt_to_use,
+                        temperature=0.0,
+                    )
                 )
-            ):
-                if chunk.text:
-                    # Log raw chunk for debugging
-                    # logger.debug(f"GEMINI RAW CHUNK: {repr(chunk.text)}")
-                    # print(f"[GEMINI RAW]: {repr(chunk.text)}", flush=True)
-                    yield chunk.text
-        except Exception as e:
-            yield f"\n\n[Error: {str(e)}]"
+                try:
+                    async for chunk in stream:
+                        if chunk.text:
+                            # Log raw chunk for debugging
+                            # logger.debug(f"GEMINI RAW CHUNK: {repr(chunk.text)}")
+                            # print(f"[GEMINI RAW]: {repr(chunk.text)}", flush=True)
+                            yield chunk.text
+                finally:
+                    await self._close_stream(stream)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                yield f"\n\n[Error: {str(e)}]"
 
     async def stream_review_with_image(
         self,
@@ -150,24 +293,14 @@ The QA Agent has reviewed the design and provided the following feedback. Please
             )
         
         # Create review message with image
-        review_prompt = f"""I've rendered the current design. Here is an image showing four different perspectives.
-
-Current code:
-```python
-{current_code}
-```
-
-Please review the rendered image and consider:
-1. Does it match what was requested?
-2. Is the design assembleable and physically realizable?
-
-Keep your response brief - either confirm the design is good, or provide the corrected code."""
+        review_prompt = _REVIEW_PROMPT_TMPL(code=current_code)
 
+        image_part = await asyncio.to_thread(self._image_part, image_data)
         contents.append(
             types.Content(
                 role="user",
                 parts=[
-                    types.Part.from_bytes(data=image_data, mime_type="image/png"),
+                    image_part,
                     types.Part.from_text(text=review_prompt)
                 ]
             )
@@ -175,20 +308,27 @@ Keep your response brief - either confirm the design is good, or provide the cor
         
         prompt_to_use = system_prompt if system_prompt is not None else self.system_prompt
         
-        try:
-            async for chunk in await self.client.aio.models.generate_content_stream(
-                model=self.designer_model,
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=prompt_to_use,
-                    temperature=0.0,
+        async with self._stream_semaphore:
+            try:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.designer_model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        system_instruction=prompt_to_use,
+                        temperature=0.0,
+                    )
                 )
-            ):
-                if chunk.text:
-                    # logger.debug(f"GEMINI REVIEW CHUNK: {repr(chunk.text)}")
-                    yield chunk.text
-        except Exception as e:
-            yield f"\n\n[Error: {str(e)}]"
+                try:
+                    async for chunk in stream:
+                        if chunk.text:
+                            # logger.debug(f"GEMINI REVIEW CHUNK: {repr(chunk.text)}")
+                            yield chunk.text
+                finally:
+                    await self._close_stream(stream)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                yield f"\n\n[Error: {str(e)}]"
 
     async def stream_qa_review(
         self,
@@ -212,45 +352,112 @@ Keep your response brief - either confirm the design is good, or provide the cor
             Text chunks from the Gemini response
         """
         # Format user messages as context
-        user_context = "\n\n".join([f"User: {msg}" for msg in user_messages])
+        user_context = "\n\n".join(f"User: {msg}" for msg in user_messages)
         
         # Create QA review message with image
-        qa_prompt = f"""Please review this woodworking assembly design.
-
-## User's Original Requests
-{user_context}
-
-## Test Suite Results
-{test_results_summary}
-
-## Rendered Design
-The image shows the current design from four different perspectives.
-
-Please provide your QA assessment following your review guidelines."""
+        qa_prompt = _QA_PROMPT_TMPL(
+            user_context=user_context,
+            test_results_summary=test_results_summary,
+        )
 
+        image_part = await asyncio.to_thread(self._image_part, image_data)
         contents = [
             types.Content(
                 role="user",
                 parts=[
-                    types.Part.from_bytes(data=image_data, mime_type="image/png"),
+                    image_part,
                     types.Part.from_text(text=qa_prompt)
                 ]
             )
         ]
         
-        try:
-            async for chunk in await self.client.aio.models.generate_content_stream(
-                model=self.qa_model,
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    temperature=0.0,
+        async with self._stream_semaphore:
+            try:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.qa_model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        system_instruction=system_prompt,
+                        temperature=0.0,
+                    )
                 )
-            ):
-                if chunk.text:
-                    yield chunk.text
-        except Exception as e:
-            yield f"\n\n[Error: {str(e)}]"
+                try:
+                    async for chunk in stream:
+                        if chunk.text:
+                            yield chunk.text
+                finally:
+                    await self._close_stream(stream)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                yield f"\n\n[Error: {str(e)}]"
+
+    async def stream_review_and_qa(
+        self,
+        image_data: bytes,
+        current_code: str,
+        test_results_summary: str,
+        user_messages: List[str],
+        history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        qa_system_prompt: str = None,
+    ) -> AsyncGenerator[Dict[str, str], None]:
+        """Run the design review and the QA review concurrently.
+
+        Both reviews are independent network streams, so running them
+        back-to-back doubles wall-clock time. This starts both and merges
+        their chunks through a queue fan-in, yielding dicts of the form
+        {'source': 'review' | 'qa', 'text': ...} so the SSE layer can
+        demultiplex them by tag.
+
+        Args:
+            image_data: PNG image bytes of the rendered design
+            current_code: The current CadQuery code
+            test_results_summary: Summarized test results text
+            user_messages: List of user messages from the conversation
+            history: Optional conversation history for the design review
+            system_prompt: Optional system prompt for the design review
+            qa_system_prompt: The QA-specific system prompt
+
+        Yields:
+            Dicts with 'source' and 'text' keys
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()  # Sentinel marking one stream as finished
+
+        async def pump(source: str, gen) -> None:
+            try:
+                async for chunk in gen:
+                    await queue.put({"source": source, "text": chunk})
+            finally:
+                await queue.put(done)
+
+        tasks = [
+            asyncio.create_task(pump("review", self.stream_review_with_image(
+                image_data=image_data,
+                current_code=current_code,
+                history=history,
+                system_prompt=system_prompt,
+            ))),
+            asyncio.create_task(pump("qa", self.stream_qa_review(
+                image_data=image_data,
+                test_results_summary=test_results_summary,
+                user_messages=user_messages,
+                system_prompt=qa_system_prompt,
+            ))),
+        ]
+
+        remaining = len(tasks)
+        try:
+            while remaining:
+                item = await queue.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
 
 
 # Singleton instance
@@ -1,22 +1,105 @@
 """Test service for validating CadQuery designs against constraints."""
 
 import logging
+import os
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+
 from ..config import get_settings
 
-try:
-    from OCP.BRepBndLib import BRepBndLib
-    from OCP.Bnd import Bnd_OBB
-    from OCP.BRepExtrema import BRepExtrema_DistShapeShape
-    HAS_OCP = True
-except ImportError:
-    HAS_OCP = False
+# OCP bindings are heavy to import; they are loaded on first use by
+# _load_ocp() so processes that never run the test suite (CLI tools,
+# cold serverless starts) don't pay the cost up front. _load_ocp()
+# populates the names below and sets HAS_OCP.
+HAS_OCP: Optional[bool] = None
+BRepBndLib = None
+Bnd_OBB = None
+Bnd_Box = None
+BRepExtrema_DistShapeShape = None
+BRepAlgoAPI_Common = None
+BRepGProp = None
+GProp_GProps = None
+TopExp_Explorer = None
+TopAbs_SOLID = None
+BRep_Builder = None
+TopoDS_Compound = None
+TopTools_ListOfShape = None
+
+
+def _load_ocp() -> bool:
+    """Import the OCP bindings on first use. Returns whether OCP is available."""
+    global HAS_OCP, BRepBndLib, Bnd_OBB, Bnd_Box, BRepExtrema_DistShapeShape
+    global BRepAlgoAPI_Common, BRepGProp, GProp_GProps
+    global TopExp_Explorer, TopAbs_SOLID, BRep_Builder, TopoDS_Compound
+    global TopTools_ListOfShape
+
+    if HAS_OCP is None:
+        try:
+            from OCP.BRepBndLib import BRepBndLib as _BRepBndLib
+            from OCP.Bnd import Bnd_OBB as _Bnd_OBB, Bnd_Box as _Bnd_Box
+            from OCP.BRepExtrema import BRepExtrema_DistShapeShape as _DistShapeShape
+            from OCP.BRepAlgoAPI import BRepAlgoAPI_Common as _Common
+            from OCP.BRepGProp import BRepGProp as _BRepGProp
+            from OCP.GProp import GProp_GProps as _GProp_GProps
+            from OCP.TopExp import TopExp_Explorer as _TopExp_Explorer
+            from OCP.TopAbs import TopAbs_SOLID as _TopAbs_SOLID
+            from OCP.BRep import BRep_Builder as _BRep_Builder
+            from OCP.TopoDS import TopoDS_Compound as _TopoDS_Compound
+            from OCP.TopTools import TopTools_ListOfShape as _TopTools_ListOfShape
+
+            BRepBndLib = _BRepBndLib
+            Bnd_OBB = _Bnd_OBB
+            Bnd_Box = _Bnd_Box
+            BRepExtrema_DistShapeShape = _DistShapeShape
+            BRepAlgoAPI_Common = _Common
+            BRepGProp = _BRepGProp
+            GProp_GProps = _GProp_GProps
+            TopExp_Explorer = _TopExp_Explorer
+            TopAbs_SOLID = _TopAbs_SOLID
+            BRep_Builder = _BRep_Builder
+            TopoDS_Compound = _TopoDS_Compound
+            TopTools_ListOfShape = _TopTools_ListOfShape
+
+            # Let OCCT parallelize edge/face intersection internally; the
+            # results are deterministic, only the scheduling changes
+            try:
+                from OCP.BOPAlgo import BOPAlgo_Options
+                BOPAlgo_Options.SetParallelMode_s(True)
+            except Exception as e:
+                logger.debug(f"Could not enable OCCT parallel mode: {e}")
+
+            HAS_OCP = True
+        except ImportError:
+            HAS_OCP = False
+    return HAS_OCP
+
 
 logger = logging.getLogger(__name__)
 
+# Per-suite cache of expensive OCCT results (OBB dims, volume) keyed by
+# id(solid). The same solids flow through all four geometry tests, so each
+# OCCT computation should run once per suite. Cleared at the start of every
+# run_test_suite call, while the suite still holds references to the solids.
+_solid_cache: Dict[int, Dict[str, Any]] = {}
+
+# cadquery module, resolved once on first use so the O(N^2) intersection
+# loop doesn't pay the sys.modules lookup per pair
+_cq = None
+
+
+def _get_cq():
+    """Return the cadquery module, importing it on first use."""
+    global _cq
+    if _cq is None:
+        import cadquery
+        _cq = cadquery
+    return _cq
+
 
 class TestStatus(str, Enum):
     PASSED = "passed"
@@ -25,7 +108,7 @@ class TestStatus(str, Enum):
     ERROR = "error"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TestResult:
     """Result of a single test."""
     name: str
@@ -35,12 +118,19 @@ class TestResult:
     long_message: Optional[str] = None  # Detailed message for agent, not displayed in UI
     
     def to_dict(self) -> Dict[str, Any]:
-        result = asdict(self)
-        result['status'] = self.status.value
-        return result
+        # Built by hand rather than via asdict(), which deep-copies every
+        # nested field - the details payload can hold info for every part.
+        # Consumers must treat the aliased details dict as read-only.
+        return {
+            'name': self.name,
+            'status': self.status.value,
+            'message': self.message,
+            'details': self.details,
+            'long_message': self.long_message,
+        }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TestSuiteResult:
     """Result of running the full test suite."""
     passed: int
@@ -64,15 +154,27 @@ def _get_oriented_dims(shape) -> Optional[List[float]]:
     """
     Calculates the dimensions (L, W, H) of the tightest-fitting
     oriented bounding box around a shape.
-    
+
     Works for:
     - Arbitrarily rotated parts
     - Parts with holes, cutouts, or chamfers
     - Plywood sheets, beams, etc.
-    
+
+    Results are memoized per solid for the duration of a suite run.
     Returns sorted dimensions [smallest, middle, largest] or None on error.
     """
-    if not HAS_OCP:
+    cached = _solid_cache.get(id(shape))
+    if cached is not None and 'dims' in cached:
+        return cached['dims']
+
+    dims = _compute_oriented_dims(shape)
+    _solid_cache.setdefault(id(shape), {})['dims'] = dims
+    return dims
+
+
+def _compute_oriented_dims(shape) -> Optional[List[float]]:
+    """Uncached oriented-bounding-box computation behind _get_oriented_dims."""
+    if not _load_ocp():
         logger.warning("OCP not available, falling back to axis-aligned bounding box")
         return _get_axis_aligned_dims(shape)
     
@@ -91,89 +193,386 @@ def _get_oriented_dims(shape) -> Optional[List[float]]:
             logger.warning(f"Unknown shape type for OBB: {type(shape)}")
             return _get_axis_aligned_dims(shape)
         
+        # Cheap path first: most cutlist parts (beams, plywood sheets) are
+        # axis-aligned boxes, for which the AABB already is the tight box.
+        # Detect that by checking how much of its AABB the solid fills, and
+        # only run the much more expensive optimal-OBB algorithm when the
+        # shape is rotated or non-boxy.
+        aabb_dims = _aabb_dims_from_topo(topo_shape)
+        if aabb_dims is not None:
+            aabb_vol = aabb_dims[0] * aabb_dims[1] * aabb_dims[2]
+            volume = _get_solid_volume(shape)
+            if aabb_vol > 0 and volume / aabb_vol >= 0.98:
+                return sorted(aabb_dims)
+
         # Calculate the oriented bounding box
         # Args: shape, obb, isTriangulation, isOptimal, isShapeToleranceUsed
         BRepBndLib.AddOBB_s(topo_shape, obb, False, True, False)
-        
-        # Extract dimensions (OBB stores half-lengths)
-        x_len = obb.XHSize() * 2
-        y_len = obb.YHSize() * 2
-        z_len = obb.ZHSize() * 2
-        
-        # Return sorted dimensions
-        return sorted([round(x_len, 2), round(y_len, 2), round(z_len, 2)])
+
+        # Return sorted dimensions (OBB stores half-lengths); rounding is
+        # deferred to the display boundary - classification tolerances
+        # dwarf the 0.01mm it would remove
+        return sorted((obb.XHSize() * 2, obb.YHSize() * 2, obb.ZHSize() * 2))
         
     except Exception as e:
         logger.warning(f"Failed to get oriented bounding box: {e}")
         return _get_axis_aligned_dims(shape)
 
 
+def _aabb_dims_from_topo(topo_shape) -> Optional[tuple]:
+    """Axis-aligned bounding box dimensions of a TopoDS_Shape via OCCT."""
+    try:
+        box = Bnd_Box()
+        BRepBndLib.Add_s(topo_shape, box)
+        xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
+        return (xmax - xmin, ymax - ymin, zmax - zmin)
+    except Exception as e:
+        logger.debug(f"AABB computation failed: {e}")
+        return None
+
+
+def _compute_all_obbs(topo_compound) -> List[Optional[List[float]]]:
+    """Compute oriented-box dims for every solid in a compound in one traversal.
+
+    Walks TopExp_Explorer over TopAbs_SOLID in a single tight loop of native
+    calls, so the per-part Python wrapping and attribute probing in
+    _compute_oriented_dims runs zero times. Solids are visited in the order
+    they were added to the compound. Each entry gets the same AABB fast path
+    as the per-part route; entries that fail come back as None.
+    """
+    dims_list: List[Optional[List[float]]] = []
+    explorer = TopExp_Explorer(topo_compound, TopAbs_SOLID)
+    while explorer.More():
+        topo = explorer.Current()
+        try:
+            aabb_dims = _aabb_dims_from_topo(topo)
+            if aabb_dims is not None:
+                aabb_vol = aabb_dims[0] * aabb_dims[1] * aabb_dims[2]
+                gprops = GProp_GProps()
+                BRepGProp.VolumeProperties_s(topo, gprops)
+                if aabb_vol > 0 and gprops.Mass() / aabb_vol >= 0.98:
+                    dims_list.append(sorted(aabb_dims))
+                    explorer.Next()
+                    continue
+
+            obb = Bnd_OBB()
+            BRepBndLib.AddOBB_s(topo, obb, False, True, False)
+            dims_list.append(sorted((obb.XHSize() * 2, obb.YHSize() * 2, obb.ZHSize() * 2)))
+        except Exception as e:
+            logger.debug(f"Batch OBB computation failed for a solid: {e}")
+            dims_list.append(None)
+        explorer.Next()
+    return dims_list
+
+
+def _prime_dims_cache(parts: List[Dict[str, Any]]) -> None:
+    """Pre-fill _solid_cache dims for all parts via one batched traversal.
+
+    Packs the parts' underlying TopoDS shapes into a temporary compound and
+    hands it to _compute_all_obbs, amortizing the per-call FFI setup across
+    the whole assembly. Parts that can't be unwrapped (or anything that goes
+    wrong) simply fall back to the per-part _get_oriented_dims path.
+    """
+    if not _load_ocp() or len(parts) < 2:
+        return
+
+    try:
+        builder = BRep_Builder()
+        compound = TopoDS_Compound()
+        builder.MakeCompound(compound)
+        packed = []  # (solid, geom key) per unique geometry, in compound order
+        geom_members: Dict[Any, List[Any]] = {}  # geom key -> duplicate solids
+        for part in parts:
+            solid = part['solid']
+            if 'dims' in _solid_cache.get(id(solid), ()):
+                continue
+            # Copies of the same source geometry (same 'geom' key) have
+            # identical dims - the OBB is invariant under the rigid
+            # placement - so only the first instance enters the compound
+            geom = part.get('geom')
+            if geom is not None:
+                members = geom_members.get(geom)
+                if members is not None:
+                    members.append(solid)
+                    continue
+                geom_members[geom] = []
+            topo = part.get('topo') or _unwrap_topo(solid)
+            if topo is None:
+                continue
+            builder.Add(compound, topo)
+            packed.append((solid, geom))
+
+        if not packed:
+            return
+
+        # The batch walk assumes each packed topo contributes exactly one
+        # TopAbs_SOLID; extraction can hand us non-solid shapes (faces,
+        # shells, empty compounds) that contribute zero, which would shift
+        # every pairing after them. Bail to the per-part path on mismatch.
+        dims_list = _compute_all_obbs(compound)
+        if len(dims_list) != len(packed):
+            logger.debug(
+                "Batched OBB count mismatch (%d packed, %d measured), using per-part path",
+                len(packed), len(dims_list),
+            )
+            return
+
+        for (solid, geom), dims in zip(packed, dims_list):
+            if dims is None:
+                continue
+            _solid_cache.setdefault(id(solid), {})['dims'] = dims
+            if geom is not None:
+                for dup in geom_members.get(geom, ()):
+                    _solid_cache.setdefault(id(dup), {})['dims'] = dims
+    except Exception as e:
+        logger.debug(f"Batched OBB priming failed, using per-part path: {e}")
+
+
 def _get_axis_aligned_dims(solid) -> Optional[List[float]]:
     """Fallback: Get axis-aligned bounding box dimensions of a solid."""
     try:
         bb = solid.BoundingBox()
-        dims = [round(bb.xlen, 2), round(bb.ylen, 2), round(bb.zlen, 2)]
-        return sorted(dims)
+        return sorted((bb.xlen, bb.ylen, bb.zlen))
     except Exception as e:
         logger.warning(f"Failed to get bounding box: {e}")
         return None
 
 
-def _classify_part(sorted_dims: List[float]) -> Dict[str, Any]:
-    """Classify a part based on its sorted dimensions [smallest, middle, largest]."""
-    parts_lib = get_settings().parts_library
-    tolerance = 1.0
-    
-    # Check beams
-    for beam in parts_lib.get('beams', []):
-        # Beams are defined by width and height. sorted_dims[0] and [1] should match.
-        # Since sorted_dims is sorted, we should sort the beam dims too to compare.
-        beam_dims = sorted([beam['width'], beam['height']])
-        
-        if (abs(sorted_dims[0] - beam_dims[0]) <= tolerance and 
-            abs(sorted_dims[1] - beam_dims[1]) <= tolerance):
-            
-            length = sorted_dims[2]
-            valid_length = _is_valid_beam_length(length, beam)
-            
-            return {
-                'type': beam['name'],
-                'cross_section': (beam['width'], beam['height']),
-                'length': length,
-                'valid_length': valid_length,
-                'beam_def': beam
-            }
-    
-    # Check plywood
-    plywood = parts_lib.get('plywood', {})
-    if plywood and abs(sorted_dims[0] - plywood.get('thickness', 7)) <= 0.5:
-        return {
-            'type': 'plywood',
-            'thickness': sorted_dims[0],
-            'width': sorted_dims[1],
-            'height': sorted_dims[2],
-            'valid_size': sorted_dims[1] <= plywood.get('max_width', 500) and sorted_dims[2] <= plywood.get('max_height', 500),
-        }
-    
+# Classification tolerances in mm, hoisted so the classifiers compare against
+# module-level constants instead of re-binding locals per call
+_CROSS_SECTION_TOL = 1.0
+_PLY_THICKNESS_TOL = 0.5
+
+# Cached beam cross-section arrays keyed by id(parts_library); the settings
+# object is itself cached, so the id is stable for the process lifetime
+_beam_index_cache: Dict[int, tuple] = {}
+
+
+def _get_beam_index(parts_lib: Dict[str, Any]) -> tuple:
+    """Return (cross_sections, beams, quant_table) for the parts library.
+
+    cross_sections is a (B, 2) array of pre-sorted beam [width, height]
+    pairs, so per-part matching is one vectorized comparison over all beams
+    instead of a Python loop that re-sorts each beam definition.
+    quant_table maps whole-mm (width, height) keys to beam definitions for
+    the common exact-dimension case.
+    """
+    cached = _beam_index_cache.get(id(parts_lib))
+    if cached is None:
+        beams = parts_lib.get('beams', [])
+        sections = [sorted((b['width'], b['height'])) for b in beams]
+        cross_sections = np.array(sections, dtype=np.float64).reshape(len(beams), 2)
+        quant_table = {}
+        for section, beam in zip(sections, beams):
+            quant_table.setdefault((round(section[0]), round(section[1])), beam)
+        cached = (cross_sections, beams, quant_table)
+        _beam_index_cache[id(parts_lib)] = cached
+    return cached
+
+
+def _beam_classification(beam: Dict[str, Any], length: float) -> Dict[str, Any]:
+    """Build the classification dict for a matched beam."""
     return {
-        'type': 'unknown',
-        'dimensions': sorted_dims,
+        'type': beam['name'],
+        'cross_section': (beam['width'], beam['height']),
+        'length': round(length, 2),
+        'valid_length': _is_valid_beam_length(length, beam),
+        'beam_def': beam
     }
 
 
+def _plywood_classification(sorted_dims: List[float], plywood: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the classification dict for a plywood sheet."""
+    return {
+        'type': 'plywood',
+        'thickness': round(sorted_dims[0], 2),
+        'width': round(sorted_dims[1], 2),
+        'height': round(sorted_dims[2], 2),
+        'valid_size': sorted_dims[1] <= plywood.get('max_width', 500) and sorted_dims[2] <= plywood.get('max_height', 500),
+    }
+
+
+# Precomputed valid-length sets keyed by id(beam_def); beam definitions live
+# in the cached settings object, so the ids are stable for the process
+_valid_length_cache: Dict[int, tuple] = {}
+
+
 def _is_valid_beam_length(length: float, beam_def: Dict[str, Any], tolerance: float = 1.0) -> bool:
-    """Check if beam length is valid based on definition."""
-    min_l = beam_def.get('min_length', 100)
-    max_l = beam_def.get('max_length', 500)
-    inc = beam_def.get('length_increment', 50)
-    
-    if length < min_l - tolerance or length > max_l + tolerance:
-        return False
-        
-    # Check increment
-    # We assume starts at min_length
-    remainder = (length - min_l) % inc
-    return remainder <= tolerance or remainder >= inc - tolerance
+    """Check if beam length is valid based on definition.
+
+    Valid lengths run from min_length in fixed increments; they are
+    enumerated once per beam definition into a frozenset, so each check is
+    a snap to the nearest increment plus one membership probe instead of
+    range/modulo arithmetic.
+    """
+    cached = _valid_length_cache.get(id(beam_def))
+    if cached is None:
+        min_l = beam_def.get('min_length', 100)
+        max_l = beam_def.get('max_length', 500)
+        inc = beam_def.get('length_increment', 50)
+        # min_l + k * inc mirrors the snap expression below exactly, so
+        # float equality between snapped values and members is safe
+        valid = frozenset(min_l + k * inc for k in range(int((max_l - min_l) / inc) + 1))
+        cached = (min_l, inc, valid)
+        _valid_length_cache[id(beam_def)] = cached
+
+    min_l, inc, valid = cached
+    snapped = min_l + round((length - min_l) / inc) * inc
+    return abs(length - snapped) <= tolerance and snapped in valid
+
+
+# Probed result kinds keyed by class; repeated extractions of the same
+# CadQuery type resolve through one dict lookup instead of the hasattr chain
+_RESULT_KIND_CACHE: Dict[type, str] = {}
+
+
+def _result_kind(result) -> str:
+    """Classify a CadQuery result object for extraction dispatch.
+
+    The hasattr/callable probing runs once per class and is cached, since
+    reflection on CadQuery objects is comparatively expensive.
+    """
+    kind = _RESULT_KIND_CACHE.get(type(result))
+    if kind is None:
+        if hasattr(result, 'objects') and hasattr(result, 'toCompound'):
+            kind = 'assembly'
+        elif hasattr(result, 'vals') and callable(result.vals):
+            kind = 'workplane'
+        elif hasattr(result, 'toCompound') and callable(result.toCompound):
+            kind = 'assembly_compound'
+        elif hasattr(result, 'Solids') and callable(result.Solids):
+            kind = 'compound'
+        elif hasattr(result, 'BoundingBox'):
+            kind = 'solid'
+        else:
+            kind = 'unknown'
+        _RESULT_KIND_CACHE[type(result)] = kind
+    return kind
+
+
+# Location objects already known to be the identity transform, keyed by id
+# with the Location itself as the value so the id cannot be recycled while
+# the entry lives. Most assembly nodes share a handful of identity locations,
+# so one dict probe replaces the IsIdentity round trip. Cleared per suite
+# alongside _solid_cache.
+_identity_locs: Dict[int, Any] = {}
+
+# Name of the transform method per solid class ('move'/'located'/'Moved', or
+# '' when none exists); probed once per type like the kind caches
+_MOVE_METHOD_CACHE: Dict[type, str] = {}
+
+
+def _apply_location_to_solid(solid, loc):
+    """Apply a CadQuery Location transform to a solid."""
+    if loc is None or id(loc) in _identity_locs:
+        return solid
+    try:
+        # CadQuery Location wraps an OCP gp_Trsf transform; identity
+        # transforms need no work
+        if hasattr(loc, 'IsIdentity') and callable(loc.IsIdentity) and loc.IsIdentity():
+            _identity_locs[id(loc)] = loc
+            return solid
+
+        # Apply the transform - solid.move(), solid.located() or the
+        # OCC-level solid.Moved()
+        method = _MOVE_METHOD_CACHE.get(type(solid))
+        if method is None:
+            method = next(
+                (m for m in ('move', 'located', 'Moved') if callable(getattr(solid, m, None))),
+                '',
+            )
+            _MOVE_METHOD_CACHE[type(solid)] = method
+
+        if method:
+            return getattr(solid, method)(loc)
+        return solid
+    except Exception as e:
+        logger.debug(f"Could not apply location transform: {e}")
+        return solid
+
+
+# Probed leaf kinds keyed by class, mirroring _RESULT_KIND_CACHE: the first
+# leaf of a given type pays the hasattr cascade, later ones a dict lookup
+_LEAF_KIND_CACHE: Dict[type, str] = {}
+
+
+def _leaf_kind(obj) -> str:
+    """Classify an assembly leaf object for extraction dispatch."""
+    kind = _LEAF_KIND_CACHE.get(type(obj))
+    if kind is None:
+        if hasattr(obj, 'val') and callable(obj.val):
+            kind = 'workplane'
+        elif hasattr(obj, 'Solids') and callable(obj.Solids):
+            kind = 'shape'
+        elif hasattr(obj, 'BoundingBox'):
+            kind = 'solid'
+        else:
+            kind = 'unknown'
+        _LEAF_KIND_CACHE[type(obj)] = kind
+    return kind
+
+
+def _iter_compound_solids(compound):
+    """Yield the solids of a compound one at a time.
+
+    Drives OCCT's TopExp_Explorer directly and wraps each TopoDS solid
+    lazily, instead of letting .Solids() materialize the whole list up
+    front; falls back to .Solids() when OCP is unavailable.
+    """
+    if _load_ocp() and hasattr(compound, 'wrapped'):
+        cq = _get_cq()
+        explorer = TopExp_Explorer(compound.wrapped, TopAbs_SOLID)
+        while explorer.More():
+            yield cq.Solid(explorer.Current())
+            explorer.Next()
+    else:
+        yield from compound.Solids()
+
+
+def _extract_leaf_solids(obj, name: str, loc, parts: List[Dict[str, Any]]) -> None:
+    """Append the solids of one assembly leaf, placed at its composed location.
+
+    Each part also carries a 'geom' key identifying its untransformed source
+    geometry. Assemblies commonly reuse one object for many placements
+    (several copies of the same beam); parts sharing a key have identical
+    shape up to a rigid motion, so rigid-invariant measurements like the
+    oriented dims only need to run once per unique geometry.
+    """
+    def append(solid, part_name: str, idx: int) -> None:
+        parts.append({
+            'solid': _apply_location_to_solid(solid, loc),
+            'name': part_name,
+            'geom': (id(obj), idx),
+        })
+
+    try:
+        kind = _leaf_kind(obj)
+        if kind == 'workplane':
+            val = obj.val()
+            if hasattr(val, 'Solids') and callable(val.Solids):
+                val_solids = val.Solids()
+                if val_solids:
+                    for idx, s in enumerate(val_solids):
+                        s_name = f"{name}_{idx+1}" if len(val_solids) > 1 else name
+                        append(s, s_name, idx)
+                else:
+                    append(val, name, 0)
+            elif hasattr(val, 'BoundingBox'):
+                append(val, name, 0)
+        elif kind == 'shape':
+            obj_solids = obj.Solids()
+            if obj_solids:
+                for idx, s in enumerate(obj_solids):
+                    s_name = f"{name}_{idx+1}" if len(obj_solids) > 1 else name
+                    append(s, s_name, idx)
+            else:
+                append(obj, name, 0)
+        elif kind == 'solid':
+            append(obj, name, 0)
+        else:
+            logger.debug("Leaf '%s' has unrecognized type %s", name, type(obj).__name__)
+    except Exception as e:
+        logger.warning("Failed to extract solid from '%s': %s", name, e)
 
 
 def _extract_solids(result) -> List[Dict[str, Any]]:
@@ -190,134 +589,60 @@ def _extract_solids(result) -> List[Dict[str, Any]]:
     parts = []
     
     try:
-        # Log the type for debugging
-        logger.info(f"Extracting solids from type: {type(result).__name__}")
-        logger.debug(f"Result attributes: {[a for a in dir(result) if not a.startswith('_')][:20]}")
-        
-        # Case 1: Assembly object - detect by checking for 'objects' attribute
-        # CadQuery Assembly has: obj, name, loc, color, children (dict), objects (dict)
-        # The 'objects' dict maps names to child Assembly nodes
-        if hasattr(result, 'objects') and hasattr(result, 'toCompound'):
-            objects_attr = getattr(result, 'objects', None)
-            
-            logger.info(f"Assembly detected - objects: {type(objects_attr)}")
-            
-            # objects can be a dict (name -> Assembly) or list
-            objects_dict = {}
-            if isinstance(objects_attr, dict):
-                objects_dict = objects_attr
-            elif objects_attr is not None:
-                # Try to convert to dict if it has items()
-                try:
-                    if hasattr(objects_attr, 'items'):
-                        objects_dict = dict(objects_attr.items())
-                    else:
-                        # It's a list-like, create dict with index keys
-                        objects_dict = {f"part_{i+1}": obj for i, obj in enumerate(objects_attr)}
-                except Exception as e:
-                    logger.warning(f"Could not process objects: {e}")
-            
-            if objects_dict:
-                logger.info(f"Processing Assembly with {len(objects_dict)} objects")
-                
-                # Log what's in objects for debugging
-                for i, (obj_name, obj_asm) in enumerate(list(objects_dict.items())[:5]):  # Log first 5
-                    logger.info(f"  objects['{obj_name}']: type={type(obj_asm).__name__}")
-                
-                def apply_location_to_solid(solid, loc):
-                    """Apply a CadQuery Location transform to a solid."""
-                    if loc is None:
-                        return solid
+        # Log the type for debugging; the dir() walk allocates hundreds of
+        # strings on CadQuery objects, so only pay for it when DEBUG is on
+        logger.info("Extracting solids from type: %s", type(result).__name__)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Result attributes: %s", [a for a in dir(result) if not a.startswith('_')][:20])
+
+        kind = _result_kind(result)
+
+        # Case 1: Assembly object
+        # CadQuery Assembly has: obj, name, loc, color, children, objects.
+        # Walk the tree iteratively with an explicit deque, composing each
+        # node's location with its ancestors' so parts of nested
+        # sub-assemblies land in world coordinates. (The flat
+        # Assembly.objects mapping only carries each node's local location,
+        # which mis-places nested children.)
+        if kind == 'assembly':
+            stack = deque([(result, None)])
+            while stack:
+                node, parent_loc = stack.popleft()
+                loc = getattr(node, 'loc', None)
+                if parent_loc is not None:
                     try:
-                        # Get the transformation from the Location
-                        if hasattr(loc, 'IsIdentity') and loc.IsIdentity():
-                            return solid  # No transformation needed
-                        
-                        # CadQuery Location wraps an OCP gp_Trsf transform
-                        # We can use .IsIdentity() to check if it's the identity transform
-                        if hasattr(loc, 'IsIdentity') and callable(loc.IsIdentity):
-                            if loc.IsIdentity():
-                                return solid
-                        
-                        # Apply the transform - solid.move() or solid.located()
-                        if hasattr(solid, 'move') and callable(solid.move):
-                            return solid.move(loc)
-                        elif hasattr(solid, 'located') and callable(solid.located):
-                            return solid.located(loc)
-                        elif hasattr(solid, 'Moved') and callable(solid.Moved):
-                            # OCC-level transform
-                            if hasattr(loc, 'IsIdentity'):
-                                return solid.Moved(loc)
-                        
-                        return solid
+                        loc = parent_loc * loc if loc is not None else parent_loc
                     except Exception as e:
-                        logger.debug(f"Could not apply location transform: {e}")
-                        return solid
-                
-                # Extract from objects dict - keys are names, values are Assembly nodes
-                for obj_name, obj_asm in objects_dict.items():
-                    # Get the location transform for this part
-                    loc = getattr(obj_asm, 'loc', None)
-                    
-                    # Get the solid from this assembly node
-                    obj = getattr(obj_asm, 'obj', None)
-                    if obj is not None:
-                        # If it's a Workplane, get the solid from it
-                        if hasattr(obj, 'val') and callable(obj.val):
-                            try:
-                                val = obj.val()
-                                if hasattr(val, 'Solids') and callable(val.Solids):
-                                    val_solids = val.Solids()
-                                    if val_solids:
-                                        for idx, s in enumerate(val_solids):
-                                            s_name = f"{obj_name}_{idx+1}" if len(val_solids) > 1 else obj_name
-                                            transformed = apply_location_to_solid(s, loc)
-                                            parts.append({'solid': transformed, 'name': s_name})
-                                    else:
-                                        transformed = apply_location_to_solid(val, loc)
-                                        parts.append({'solid': transformed, 'name': obj_name})
-                                elif hasattr(val, 'BoundingBox'):
-                                    transformed = apply_location_to_solid(val, loc)
-                                    parts.append({'solid': transformed, 'name': obj_name})
-                            except Exception as e:
-                                logger.warning(f"Failed to extract solid from '{obj_name}': {e}")
-                        elif hasattr(obj, 'Solids') and callable(obj.Solids):
-                            obj_solids = obj.Solids()
-                            if obj_solids:
-                                for idx, s in enumerate(obj_solids):
-                                    s_name = f"{obj_name}_{idx+1}" if len(obj_solids) > 1 else obj_name
-                                    transformed = apply_location_to_solid(s, loc)
-                                    parts.append({'solid': transformed, 'name': s_name})
-                            else:
-                                transformed = apply_location_to_solid(obj, loc)
-                                parts.append({'solid': transformed, 'name': obj_name})
-                        elif hasattr(obj, 'BoundingBox'):
-                            transformed = apply_location_to_solid(obj, loc)
-                            parts.append({'solid': transformed, 'name': obj_name})
-                    else:
-                        logger.debug(f"Object '{obj_name}' has no obj attribute")
-                
-                logger.info(f"Extracted {len(parts)} parts from Assembly.objects")
-                for p in parts:
-                    logger.info(f"  Part: name='{p['name']}'")
-            
-            # Fallback: if we didn't find any solids via objects list, use toCompound()
+                        logger.debug(f"Could not compose locations: {e}")
+                        loc = parent_loc
+
+                obj = getattr(node, 'obj', None)
+                if obj is not None:
+                    name = getattr(node, 'name', None) or f"part_{len(parts) + 1}"
+                    _extract_leaf_solids(obj, name, loc, parts)
+
+                for child in getattr(node, 'children', None) or ():
+                    stack.append((child, loc))
+
+            logger.info("Extracted %d parts from Assembly tree", len(parts))
+
+            # Fallback: if we didn't find any solids via the tree walk, use toCompound()
             if not parts and hasattr(result, 'toCompound'):
                 logger.info("No solids found via objects, trying toCompound() fallback")
                 try:
                     compound = result.toCompound()
                     if hasattr(compound, 'Solids') and callable(compound.Solids):
-                        solids = list(compound.Solids())
-                        parts = [{'solid': s, 'name': f'part_{i+1}'} for i, s in enumerate(solids)]
-                        logger.info(f"Extracted {len(parts)} solids via toCompound() fallback")
+                        parts = [{'solid': s, 'name': f'part_{i+1}'}
+                                 for i, s in enumerate(_iter_compound_solids(compound))]
+                        logger.info("Extracted %d solids via toCompound() fallback", len(parts))
                 except Exception as e:
                     logger.warning(f"toCompound() fallback failed: {e}")
             
         # Case 2: Workplane object (legacy support)
-        elif hasattr(result, 'vals') and callable(result.vals):
+        elif kind == 'workplane':
             # Use .vals() to get ALL objects in the workplane, not just the last one
             vals = result.vals()
-            logger.info(f"Workplane contains {len(vals)} objects")
+            logger.info("Workplane contains %d objects", len(vals))
             
             part_idx = 0
             for val in vals:
@@ -335,40 +660,61 @@ def _extract_solids(result) -> List[Dict[str, Any]]:
                     part_idx += 1
                     parts.append({'solid': val, 'name': f'part_{part_idx}'})
                     
-            logger.info(f"Extracted {len(parts)} solids from Workplane")
+            logger.info("Extracted %d solids from Workplane", len(parts))
             
         # Case 3: Assembly with toCompound (fallback)
-        elif hasattr(result, 'toCompound') and callable(result.toCompound):
+        elif kind == 'assembly_compound':
             compound = result.toCompound()
             if hasattr(compound, 'Solids') and callable(compound.Solids):
-                solids = list(compound.Solids())
-                parts = [{'solid': s, 'name': f'part_{i+1}'} for i, s in enumerate(solids)]
-            logger.info(f"Extracted {len(parts)} solids from Assembly.toCompound()")
+                parts = [{'solid': s, 'name': f'part_{i+1}'}
+                         for i, s in enumerate(_iter_compound_solids(compound))]
+            logger.info("Extracted %d solids from Assembly.toCompound()", len(parts))
             
         # Case 4: Compound or shape with Solids method
-        elif hasattr(result, 'Solids') and callable(result.Solids):
-            solids = list(result.Solids())
-            parts = [{'solid': s, 'name': f'part_{i+1}'} for i, s in enumerate(solids)]
-            logger.info(f"Extracted {len(parts)} solids from Compound")
+        elif kind == 'compound':
+            parts = [{'solid': s, 'name': f'part_{i+1}'}
+                     for i, s in enumerate(_iter_compound_solids(result))]
+            logger.info("Extracted %d solids from Compound", len(parts))
             
         # Case 5: Direct solid
-        elif hasattr(result, 'BoundingBox'):
+        elif kind == 'solid':
             parts.append({'solid': result, 'name': 'part_1'})
             logger.info("Result appears to be a single solid")
             
         else:
-            logger.warning(f"Unknown result type: {type(result)}, attributes: {dir(result)[:10]}...")
+            logger.warning("Unknown result type: %s, attributes: %s...", type(result), dir(result)[:10])
             
     except Exception as e:
         logger.warning(f"Failed to extract solids: {e}", exc_info=True)
-    
+
+    # Unwrap each part's TopoDS shape once here; the pairwise tests would
+    # otherwise re-unwrap per pair
+    for part in parts:
+        part['topo'] = _unwrap_topo(part['solid'])
+
     return parts
 
 
+# Compiled user scripts keyed by source text; bounded LRU. Skips the CPython
+# parse/compile step when the same script is executed again (e.g. after the
+# suite-result cache evicted its entry or the module set changed).
+_CODE_CACHE_SIZE = 64
+_code_cache: "OrderedDict[str, Any]" = OrderedDict()
+
+
 def test_code_executes(code: str, exec_globals: dict) -> TestResult:
     """Test 1: Check if the code executes without errors."""
     try:
-        exec(code, exec_globals)
+        code_obj = _code_cache.get(code)
+        if code_obj is None:
+            code_obj = compile(code, '<user>', 'exec')
+            _code_cache[code] = code_obj
+            if len(_code_cache) > _CODE_CACHE_SIZE:
+                _code_cache.popitem(last=False)
+        else:
+            _code_cache.move_to_end(code)
+
+        exec(code_obj, exec_globals)
         
         # Check if result is defined
         if 'result' not in exec_globals:
@@ -406,10 +752,68 @@ def test_code_executes(code: str, exec_globals: dict) -> TestResult:
         )
 
 
-def test_parts_in_library(result) -> TestResult:
+def _classify_parts_bulk(parts: List[Dict[str, Any]], parts_lib: Dict[str, Any]):
+    """Classify all parts at once; yields (index, name, sorted_dims, classification).
+
+    Dims are packed into one (M, 3) array so the beam cross-section match
+    for the whole assembly is a single broadcasted comparison against the
+    library instead of a per-part probe; the classification dicts are then
+    materialized from the resulting masks. Parts whose dimensions cannot
+    be computed are skipped.
+    """
+    measured = [
+        (i, part_data['name'], sorted_dims)
+        for i, part_data in enumerate(parts)
+        if (sorted_dims := _get_oriented_dims(part_data['solid'])) is not None
+    ]
+    if not measured:
+        return []
+
+    tolerance = _CROSS_SECTION_TOL
+    dims_arr = np.array([m[2] for m in measured], dtype=np.float64)
+
+    cross_sections, beams, quant_table = _get_beam_index(parts_lib)
+    matched_beams: List[Optional[Dict[str, Any]]] = [None] * len(measured)
+    if len(beams):
+        # Whole-mm fast path: quantize the cross-section dims to int32 and
+        # resolve through the precomputed table, same as the scalar
+        # classifier. Only rows that miss pay the broadcasted float
+        # tolerance comparison.
+        dims_int = np.rint(dims_arr[:, :2]).astype(np.int32).tolist()
+        miss_rows = []
+        for row, key in enumerate(dims_int):
+            beam = quant_table.get(tuple(key))
+            if beam is not None:
+                matched_beams[row] = beam
+            else:
+                miss_rows.append(row)
+
+        if miss_rows:
+            match = (
+                np.abs(dims_arr[miss_rows, None, :2] - cross_sections[None, :, :]) <= tolerance
+            ).all(axis=2)
+            for k, row in enumerate(miss_rows):
+                if match[k].any():
+                    matched_beams[row] = beams[int(match[k].argmax())]
+
+    plywood = parts_lib.get('plywood', {})
+    ply_thickness = plywood.get('thickness', 7) if plywood else None
+
+    classified = []
+    for row, (i, name, sorted_dims) in enumerate(measured):
+        beam = matched_beams[row]
+        if beam is not None:
+            classification = _beam_classification(beam, sorted_dims[2])
+        elif ply_thickness is not None and abs(sorted_dims[0] - ply_thickness) <= _PLY_THICKNESS_TOL:
+            classification = _plywood_classification(sorted_dims, plywood)
+        else:
+            classification = {'type': 'unknown', 'dimensions': [round(d, 2) for d in sorted_dims]}
+        classified.append((i, name, sorted_dims, classification))
+    return classified
+
+
+def test_parts_in_library(parts: List[Dict[str, Any]]) -> TestResult:
     """Test 2: Check if all parts meet the design constraints."""
-    parts = _extract_solids(result)
-    
     if not parts:
         return TestResult(
             name="Parts in Library",
@@ -419,20 +823,18 @@ def test_parts_in_library(result) -> TestResult:
     
     parts_info = []
     violations = []
-    
-    for i, part_data in enumerate(parts):
-        solid = part_data['solid']
-        name = part_data['name']
-        
-        sorted_dims = _get_oriented_dims(solid)
-        if sorted_dims is None:
-            continue
-            
-        classification = _classify_part(sorted_dims)
+
+    # Batch-fill the dims cache in one OCCT traversal before the per-part loop
+    _prime_dims_cache(parts)
+
+    # Fetch the library once; _classify_parts_bulk matches all parts against it
+    parts_lib = get_settings().parts_library
+
+    for i, name, sorted_dims, classification in _classify_parts_bulk(parts, parts_lib):
         part_info = {
             'index': i + 1,
             'name': name,
-            'dimensions': sorted_dims,
+            'dimensions': [round(d, 2) for d in sorted_dims],
             'classification': classification,
         }
         parts_info.append(part_info)
@@ -495,41 +897,142 @@ def test_parts_in_library(result) -> TestResult:
 
 
 def _get_solid_volume(solid) -> float:
-    """Get the volume of a solid, returns 0 if unable to calculate."""
+    """Get the volume of a solid, returns 0 if unable to calculate.
+
+    Memoized per solid for the duration of a suite run.
+    """
+    cached = _solid_cache.get(id(solid))
+    if cached is not None and 'volume' in cached:
+        return cached['volume']
+
+    volume = _compute_solid_volume(solid)
+    _solid_cache.setdefault(id(solid), {})['volume'] = volume
+    return volume
+
+
+def _get_mass_properties(solid) -> tuple:
+    """Get (volume, center) of a solid in one OCCT mass-properties pass.
+
+    solid.Volume() and solid.Center() each run BRepGProp internally, so
+    callers that need both were paying for two traversals. One
+    VolumeProperties call produces both; memoized per solid per suite run.
+    """
+    cached = _solid_cache.get(id(solid))
+    if cached is not None and 'mass_props' in cached:
+        return cached['mass_props']
+
+    props = None
+    if _load_ocp():
+        try:
+            topo = _unwrap_topo(solid)
+            if topo is not None:
+                gprops = GProp_GProps()
+                BRepGProp.VolumeProperties_s(topo, gprops)
+                com = gprops.CentreOfMass()
+                props = (gprops.Mass(), (com.X(), com.Y(), com.Z()))
+        except Exception as e:
+            logger.debug(f"Mass properties computation failed: {e}")
+
+    if props is None:
+        # Fallback: separate CadQuery calls
+        try:
+            center = solid.Center()
+            props = (_compute_solid_volume(solid), (center.x, center.y, center.z))
+        except Exception:
+            props = (0.0, (0.0, 0.0, 0.0))
+
+    entry = _solid_cache.setdefault(id(solid), {})
+    entry['mass_props'] = props
+    entry.setdefault('volume', props[0])
+    return props
+
+
+def _compute_solid_volume(solid) -> float:
+    """Uncached volume computation behind _get_solid_volume."""
     try:
         if hasattr(solid, 'Volume') and callable(solid.Volume):
             return solid.Volume()
         elif hasattr(solid, 'val') and callable(solid.val):
             return solid.val().Volume()
+        elif _load_ocp():
+            # Raw TopoDS_Shape (e.g. the output of BRepAlgoAPI_Common)
+            props = GProp_GProps()
+            BRepGProp.VolumeProperties_s(solid, props)
+            return props.Mass()
     except Exception:
         pass
     return 0.0
 
 
-def _compute_intersection(solid1, solid2) -> Optional[Any]:
+def _unwrap_topo(solid) -> Optional[Any]:
+    """Get the underlying TopoDS_Shape from a Workplane or Shape."""
+    if hasattr(solid, 'val') and callable(solid.val):
+        solid = solid.val()
+    return getattr(solid, 'wrapped', None)
+
+
+def _compute_intersection(solid1, solid2, topo1=None, topo2=None) -> Optional[Any]:
     """Compute the boolean intersection of two solids.
-    
-    Returns the intersection solid, or None if no intersection or error.
+
+    Runs OCCT's BRepAlgoAPI_Common directly on the unwrapped TopoDS shapes,
+    skipping CadQuery's Workplane wrapping and operation-history tracking;
+    falls back to the CadQuery boolean when OCP is unavailable.
+    Callers that unwrapped the shapes already (extraction stores them on
+    the part dicts) pass them via topo1/topo2 to skip the per-pair unwrap.
+    Returns the intersection shape, or None if no intersection or error.
     """
     try:
-        # Import cadquery for boolean operations
-        import cadquery as cq
-        
+        if _load_ocp():
+            if topo1 is None:
+                topo1 = _unwrap_topo(solid1)
+            if topo2 is None:
+                topo2 = _unwrap_topo(solid2)
+            if topo1 is None or topo2 is None:
+                return None
+
+            # Cheap probe first: a positive minimum distance means the
+            # shapes are separated and no volumetric overlap is possible,
+            # so the much more expensive boolean can be skipped. Distance
+            # zero (touching or penetrating) falls through to the boolean.
+            dist = BRepExtrema_DistShapeShape(topo1, topo2)
+            dist.Perform()
+            if dist.IsDone() and dist.Value() > 0.0:
+                return None
+
+            # Default-construct the op and feed the shapes through
+            # SetArguments/SetTools: the legacy two-shape constructor runs
+            # the boolean immediately, so any options set afterwards would
+            # only apply to a redundant rebuild
+            args = TopTools_ListOfShape()
+            args.Append(topo1)
+            tools = TopTools_ListOfShape()
+            tools.Append(topo2)
+            op = BRepAlgoAPI_Common()
+            op.SetArguments(args)
+            op.SetTools(tools)
+            op.SetRunParallel(True)
+            op.Build()
+            if op.IsDone():
+                return op.Shape()
+            return None
+
+        cq = _get_cq()
+
         # Get the underlying shape objects
         shape1 = solid1
         shape2 = solid2
-        
+
         # If they're wrapped in Workplane, extract the solid
         if hasattr(solid1, 'val') and callable(solid1.val):
             shape1 = solid1.val()
         if hasattr(solid2, 'val') and callable(solid2.val):
             shape2 = solid2.val()
-        
+
         # Perform boolean intersection using CadQuery
         # We need to wrap in a Workplane to use CQ operations
         wp = cq.Workplane("XY").add(shape1)
         intersection = wp.intersect(cq.Workplane("XY").add(shape2))
-        
+
         # Check if the intersection produced any solids
         try:
             result = intersection.val()
@@ -537,18 +1040,16 @@ def _compute_intersection(solid1, solid2) -> Optional[Any]:
                 return result
         except Exception:
             pass
-            
+
         return None
-        
+
     except Exception as e:
         logger.debug(f"Intersection computation failed: {e}")
         return None
 
 
-def test_no_intersections(result) -> TestResult:
+def test_no_intersections(parts: List[Dict[str, Any]]) -> TestResult:
     """Test 3: Check if any parts intersect with each other."""
-    parts = _extract_solids(result)
-    
     if len(parts) < 2:
         return TestResult(
             name="No Part Intersections",
@@ -558,40 +1059,63 @@ def test_no_intersections(result) -> TestResult:
     
     intersections = []
     checked_pairs = 0
-    
-    # Check each pair of solids for intersection
+
+    # Broad phase: most pairs in a furniture assembly are spatially disjoint,
+    # and the OCCT boolean is far too expensive to run on all of them. Only
+    # pairs whose axis-aligned bounding boxes overlap reach the narrow phase.
+    boxes = _collect_aabbs(parts)
+    overlap = _aabb_overlap_matrix(boxes, tolerance=0.0) if boxes is not None else None
+
+    # Collect the pairs that survive the broad phase
+    candidate_pairs = []
     for i in range(len(parts)):
         for j in range(i + 1, len(parts)):
             checked_pairs += 1
-            part1 = parts[i]
-            part2 = parts[j]
-            solid1 = part1['solid']
-            solid2 = part2['solid']
-            name1 = part1['name']
-            name2 = part2['name']
-            
-            try:
-                # Compute the intersection
-                intersection = _compute_intersection(solid1, solid2)
-                
-                if intersection is not None:
-                    # Get the volume of the intersection
-                    volume = _get_solid_volume(intersection)
-                    
-                    # Use a small threshold to account for floating point errors
-                    # and minor touching surfaces (1 cubic mm threshold)
-                    if volume > 1.0:
-                        intersections.append({
-                            'part1': i + 1,
-                            'part2': j + 1,
-                            'name1': name1,
-                            'name2': name2,
-                            'volume': round(volume, 2),
-                        })
-                        logger.info(f"Found intersection between '{name1}' and '{name2}': volume={volume:.2f}mm³")
-                        
-            except Exception as e:
-                logger.warning(f"Error checking intersection between '{name1}' and '{name2}': {e}")
+            if overlap is not None and not overlap[i, j]:
+                continue
+            candidate_pairs.append((i, j))
+
+    def check_pair(pair) -> Optional[Dict[str, Any]]:
+        """Narrow-phase check of one candidate pair."""
+        i, j = pair
+        name1 = parts[i]['name']
+        name2 = parts[j]['name']
+
+        try:
+            # Compute the intersection, reusing the pre-unwrapped shapes
+            intersection = _compute_intersection(
+                parts[i]['solid'], parts[j]['solid'],
+                topo1=parts[i].get('topo'), topo2=parts[j].get('topo'),
+            )
+
+            if intersection is not None:
+                # Get the volume of the intersection (uncached - intersection
+                # shapes are one-offs and must not pollute the solid cache)
+                volume = _compute_solid_volume(intersection)
+
+                # Use a small threshold to account for floating point errors
+                # and minor touching surfaces (1 cubic mm threshold)
+                if volume > 1.0:
+                    logger.info(f"Found intersection between '{name1}' and '{name2}': volume={volume:.2f}mm³")
+                    return {
+                        'part1': i + 1,
+                        'part2': j + 1,
+                        'name1': name1,
+                        'name2': name2,
+                        'volume': round(volume, 2),
+                    }
+
+        except Exception as e:
+            logger.warning(f"Error checking intersection between '{name1}' and '{name2}': {e}")
+        return None
+
+    # The surviving pairs are independent and OCCT releases the GIL for the
+    # boolean work, so spread them over a thread pool
+    if candidate_pairs:
+        with ThreadPoolExecutor(max_workers=min(len(candidate_pairs), os.cpu_count() or 1)) as executor:
+            for found in executor.map(check_pair, candidate_pairs):
+                if found is not None:
+                    intersections.append(found)
     
     if intersections:
         # Build human-readable intersection descriptions
@@ -624,9 +1148,52 @@ def test_no_intersections(result) -> TestResult:
     )
 
 
-def _are_parts_connected(solid1, solid2, tolerance=0.1) -> bool:
-    """Check if two solids are connected (distance < tolerance)."""
-    if not HAS_OCP:
+def _collect_aabbs(parts: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Collect axis-aligned bounding boxes of all parts into an (N, 6) array.
+
+    Columns are [xmin, ymin, zmin, xmax, ymax, zmax]. Returns None if any
+    bounding box cannot be computed. Each solid's box is memoized in the
+    per-suite cache, so the intersection, connectivity and stability tests
+    all share one OCCT bounding-box computation per part.
+    """
+    boxes = np.empty((len(parts), 6), dtype=np.float64)
+    for i, part in enumerate(parts):
+        solid = part['solid']
+        cached = _solid_cache.get(id(solid))
+        if cached is not None and 'aabb' in cached:
+            boxes[i] = cached['aabb']
+            continue
+        try:
+            bb = solid.BoundingBox()
+            row = (bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax)
+        except Exception as e:
+            logger.warning(f"Failed to get bounding box for '{part['name']}': {e}")
+            return None
+        _solid_cache.setdefault(id(solid), {})['aabb'] = row
+        boxes[i] = row
+    return boxes
+
+
+def _aabb_overlap_matrix(boxes: np.ndarray, tolerance: float) -> np.ndarray:
+    """Boolean (N, N) matrix of pairwise AABB overlap within tolerance.
+
+    Three broadcasted comparisons replace the per-pair Python min/max
+    checks, so the whole pair grid is evaluated in a few NumPy passes.
+    """
+    mins = boxes[:, :3]
+    maxs = boxes[:, 3:]
+    overlap = (mins[:, None, :] - tolerance <= maxs[None, :, :]) & \
+              (maxs[:, None, :] + tolerance >= mins[None, :, :])
+    return overlap.all(axis=2)
+
+
+def _are_parts_connected(solid1, solid2, tolerance=0.1, topo1=None, topo2=None) -> bool:
+    """Check if two solids are connected (distance < tolerance).
+
+    Pre-unwrapped TopoDS shapes can be passed via topo1/topo2 to skip the
+    per-pair attribute probing.
+    """
+    if not _load_ocp():
         # Fallback: Check bounding box intersection
         # This is a loose check, but better than nothing if OCP is missing
         try:
@@ -644,9 +1211,9 @@ def _are_parts_connected(solid1, solid2, tolerance=0.1) -> bool:
 
     try:
         # Use OCP to calculate minimum distance
-        shape1 = solid1.wrapped if hasattr(solid1, 'wrapped') else solid1
-        shape2 = solid2.wrapped if hasattr(solid2, 'wrapped') else solid2
-        
+        shape1 = topo1 if topo1 is not None else (solid1.wrapped if hasattr(solid1, 'wrapped') else solid1)
+        shape2 = topo2 if topo2 is not None else (solid2.wrapped if hasattr(solid2, 'wrapped') else solid2)
+
         dist_calc = BRepExtrema_DistShapeShape(shape1, shape2)
         dist_calc.Perform()
         
@@ -660,10 +1227,8 @@ def _are_parts_connected(solid1, solid2, tolerance=0.1) -> bool:
     return False
 
 
-def test_connectivity(result: Any) -> TestResult:
+def test_connectivity(parts: List[Dict[str, Any]]) -> TestResult:
     """Test 5: Check if all parts are connected (no floating parts)."""
-    parts = _extract_solids(result)
-    
     if not parts:
         return TestResult(
             name="Part Connectivity",
@@ -678,30 +1243,50 @@ def test_connectivity(result: Any) -> TestResult:
             message="Single part is inherently connected",
         )
         
-    # Build adjacency graph
     n = len(parts)
-    adj = [[] for _ in range(n)]
-    
-    # Check all pairs (O(N^2)) - acceptable for small furniture assemblies
-    for i in range(n):
-        for j in range(i + 1, n):
-            if _are_parts_connected(parts[i]['solid'], parts[j]['solid']):
-                adj[i].append(j)
-                adj[j].append(i)
-                
-    # BFS to find connected components
-    visited = [False] * n
-    queue = [0] # Start from first part
-    visited[0] = True
-    
-    while queue:
-        u = queue.pop(0)
-        for v in adj[u]:
-            if not visited[v]:
-                visited[v] = True
-                queue.append(v)
-                
-    # Check if all visited
+
+    boxes = _collect_aabbs(parts)
+
+    # Broad phase: candidate pairs from the vectorized AABB overlap. Parts
+    # whose boxes don't come within tolerance cannot be touching, so the
+    # expensive OCCT minimum-distance check only runs on the survivors.
+    if boxes is not None:
+        overlap = _aabb_overlap_matrix(boxes, tolerance=0.1)
+        candidate_pairs = list(zip(*np.nonzero(np.triu(overlap, k=1))))
+    else:
+        candidate_pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+    # Union-find over confirmed contacts; merging as we go replaces the
+    # adjacency list + BFS and lets us skip the distance check entirely for
+    # pairs already known to share a component
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # Path compression
+            x = parent[x]
+        return x
+
+    for i, j in candidate_pairs:
+        i, j = int(i), int(j)
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            continue
+        if not _load_ocp() and boxes is not None:
+            # Without OCP the AABB overlap *is* the connectivity test
+            connected = True
+        else:
+            connected = _are_parts_connected(
+                parts[i]['solid'], parts[j]['solid'],
+                topo1=parts[i].get('topo'), topo2=parts[j].get('topo'),
+            )
+        if connected:
+            parent[root_i] = root_j
+
+    # All parts connected iff every part shares part 0's component
+    main_root = find(0)
+    visited = [find(i) == main_root for i in range(n)]
+
     if all(visited):
         return TestResult(
             name="Part Connectivity",
@@ -732,16 +1317,99 @@ def test_connectivity(result: Any) -> TestResult:
         )
 
 
-def test_static_stability(result: Any) -> TestResult:
+def _assembly_mass_properties(parts: List[Dict[str, Any]]) -> Optional[tuple]:
+    """Get (total_volume, center) for the whole assembly in one OCCT call.
+
+    Packs the parts' TopoDS shapes into a temporary compound and runs a
+    single VolumeProperties pass, which accumulates the volume-weighted
+    center natively instead of N Python-side round trips. Returns None if
+    OCP is missing or any part can't be unwrapped, letting the caller fall
+    back to the per-part loop.
+    """
+    if not _load_ocp():
+        return None
+    try:
+        builder = BRep_Builder()
+        compound = TopoDS_Compound()
+        builder.MakeCompound(compound)
+        for part in parts:
+            topo = part.get('topo') or _unwrap_topo(part['solid'])
+            if topo is None:
+                return None
+            builder.Add(compound, topo)
+
+        gprops = GProp_GProps()
+        BRepGProp.VolumeProperties_s(compound, gprops)
+        com = gprops.CentreOfMass()
+        return gprops.Mass(), (com.X(), com.Y(), com.Z())
+    except Exception as e:
+        logger.debug(f"Assembly mass properties failed: {e}")
+        return None
+
+
+def _convex_hull_2d(points: np.ndarray) -> Optional[np.ndarray]:
+    """2D convex hull of an (N, 2) point array via Andrew's monotone chain.
+
+    Returns the hull vertices in counter-clockwise order, or None for
+    degenerate inputs (fewer than 3 distinct points, or all collinear) so
+    callers can fall back to a simpler containment test.
+    """
+    pts = np.unique(points, axis=0)  # also sorts lexicographically
+    if len(pts) < 3:
+        return None
+
+    def build(chain_pts):
+        chain: List[np.ndarray] = []
+        for p in chain_pts:
+            while len(chain) >= 2:
+                a, b = chain[-2], chain[-1]
+                # 2D cross product of (b - a) and (p - a); <= 0 means no
+                # left turn, so b is not a hull vertex
+                if (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0]) <= 0:
+                    chain.pop()
+                else:
+                    break
+            chain.append(p)
+        return chain
+
+    lower = build(pts)
+    upper = build(pts[::-1])
+    hull = lower[:-1] + upper[:-1]
+    if len(hull) < 3:
+        return None
+    return np.array(hull)
+
+
+def _point_in_convex_polygon(point, hull: np.ndarray) -> tuple:
+    """Containment test of a point against a counter-clockwise convex hull.
+
+    Returns (inside, margin). The margin is the smallest signed distance
+    from the point to a hull edge line: positive when the point is inside
+    (distance to the nearest edge), negative when outside.
+    """
+    px, py = point
+    margin = float('inf')
+    n = len(hull)
+    for k in range(n):
+        ax, ay = hull[k]
+        bx, by = hull[(k + 1) % n]
+        ex, ey = bx - ax, by - ay
+        length = (ex * ex + ey * ey) ** 0.5
+        if length <= 0:
+            continue
+        # Positive on the interior side for a CCW hull
+        margin = min(margin, (ex * (py - ay) - ey * (px - ax)) / length)
+    return margin >= 0, margin
+
+
+def test_static_stability(parts: List[Dict[str, Any]]) -> TestResult:
     """
     Test 4: Check for static stability using Geometric Analysis.
-    
+
     Calculates the Center of Mass (CoM) of the assembly and checks
     if its projection onto the ground lies within the support base.
     """
     try:
-        # Extract solids
-        parts = _extract_solids(result)
         if not parts:
             return TestResult(
                 name="Static Stability",
@@ -750,93 +1418,103 @@ def test_static_stability(result: Any) -> TestResult:
             )
 
         # 1. Calculate Combined Center of Mass (CoM)
-        total_volume = 0.0
-        weighted_center = [0.0, 0.0, 0.0]
+        # Assuming uniform density for all parts. Preferred path: one
+        # native VolumeProperties pass over a compound of all parts, which
+        # yields the weighted center without any per-part round trips.
+        assembly_props = _assembly_mass_properties(parts)
+        if assembly_props is not None and assembly_props[0] > 0:
+            total_volume = assembly_props[0]
+            com = list(assembly_props[1])
+        else:
+            # Fallback: gather per-part volumes and centers into arrays so
+            # the weighted sum is one NumPy reduction
+            n = len(parts)
+            vols = np.empty(n, dtype=np.float64)
+            centers = np.empty((n, 3), dtype=np.float64)
+            for i, part in enumerate(parts):
+                vols[i], centers[i] = _get_mass_properties(part['solid'])
+
+            # Failed parts come back with zero volume and contribute nothing
+            vols = np.maximum(vols, 0.0)
+            total_volume = float(vols.sum())
+
+            if total_volume <= 0:
+                return TestResult(
+                    name="Static Stability",
+                    status=TestStatus.SKIPPED,
+                    message="Could not calculate volume of parts",
+                )
+
+            com = ((centers.T @ vols) / total_volume).tolist()
         
-        for part in parts:
-            solid = part['solid']
-            # Assuming uniform density for all parts
-            vol = _get_solid_volume(solid)
-            if vol <= 0:
-                continue
-                
-            center = solid.Center()
-            total_volume += vol
-            weighted_center[0] += center.x * vol
-            weighted_center[1] += center.y * vol
-            weighted_center[2] += center.z * vol
-            
-        if total_volume <= 0:
-             return TestResult(
+        # 2. Find the Base (Support Polygon)
+        # Bounding boxes come from the shared per-suite cache, so parts
+        # already measured by the intersection/connectivity tests cost
+        # nothing here
+        boxes = _collect_aabbs(parts)
+        if boxes is None:
+            return TestResult(
                 name="Static Stability",
-                status=TestStatus.SKIPPED,
-                message="Could not calculate volume of parts",
+                status=TestStatus.ERROR,
+                message="Could not compute bounding boxes of parts",
             )
-            
-        com = [
-            weighted_center[0] / total_volume,
-            weighted_center[1] / total_volume,
-            weighted_center[2] / total_volume
-        ]
-        
-        # 2. Find the Base (Support Polygon)
-        # Find the lowest Z coordinate
-        min_z = float('inf')
-        for part in parts:
-            bb = part['solid'].BoundingBox()
-            if bb.zmin < min_z:
-                min_z = bb.zmin
-                
-        # Identify parts that touch the ground (within 1mm tolerance)
-        ground_threshold = min_z + 1.0
-        base_points = []
-        
-        for part in parts:
-            solid = part['solid']
-            bb = solid.BoundingBox()
-            
-            if bb.zmin <= ground_threshold:
-                # This part is touching the ground.
-                # We use its bounding box corners as support points.
-                # This is a simplification; ideally we'd use the exact contact face.
-                base_points.append((bb.xmin, bb.ymin))
-                base_points.append((bb.xmax, bb.ymin))
-                base_points.append((bb.xmin, bb.ymax))
-                base_points.append((bb.xmax, bb.ymax))
-        
-        if not base_points:
+
+        # Lowest Z and the parts touching the ground (within 1mm tolerance)
+        # come from one reduction plus one boolean mask over the box array,
+        # rather than two passes over the parts
+        min_z = float(boxes[:, 2].min())
+        ground_boxes = boxes[boxes[:, 2] <= min_z + 1.0]
+
+        if not len(ground_boxes):
              return TestResult(
                 name="Static Stability",
                 status=TestStatus.FAILED,
                 message="No parts found touching the ground (floating object?)",
             )
-            
+
         # 3. Check if CoM is inside the Support Polygon
-        # We use the Bounding Box of the base points as a robust approximation
-        # for the support polygon. This works well for rectangular furniture.
-        base_min_x = min(p[0] for p in base_points)
-        base_max_x = max(p[0] for p in base_points)
-        base_min_y = min(p[1] for p in base_points)
-        base_max_y = max(p[1] for p in base_points)
-        
-        is_stable_x = base_min_x <= com[0] <= base_max_x
-        is_stable_y = base_min_y <= com[1] <= base_max_y
-        
-        # Calculate margins (how close to the edge is the CoM?)
-        margin_x = min(com[0] - base_min_x, base_max_x - com[0])
-        margin_y = min(com[1] - base_min_y, base_max_y - com[1])
-        min_margin = min(margin_x, margin_y)
-        
+        # The true support region is the convex hull of the ground-contact
+        # corners, which handles L-shaped bases and tripods that the old
+        # bounding-box approximation would misjudge. The margin is the
+        # signed distance from the CoM projection to the nearest hull edge.
+        base_min_x = float(ground_boxes[:, 0].min())
+        base_max_x = float(ground_boxes[:, 3].max())
+        base_min_y = float(ground_boxes[:, 1].min())
+        base_max_y = float(ground_boxes[:, 4].max())
+
+        corners = np.concatenate([
+            ground_boxes[:, [0, 1]],
+            ground_boxes[:, [3, 1]],
+            ground_boxes[:, [0, 4]],
+            ground_boxes[:, [3, 4]],
+        ])
+        hull = _convex_hull_2d(corners)
+
+        if hull is not None:
+            is_stable, min_margin = _point_in_convex_polygon((com[0], com[1]), hull)
+        else:
+            # Degenerate footprint (e.g. collinear contact points): fall
+            # back to the axis-aligned bounds test
+            is_stable = (base_min_x <= com[0] <= base_max_x
+                         and base_min_y <= com[1] <= base_max_y)
+            margin_x = min(com[0] - base_min_x, base_max_x - com[0])
+            margin_y = min(com[1] - base_min_y, base_max_y - com[1])
+            min_margin = min(margin_x, margin_y)
+
+        # Round via NumPy in bulk rather than one round() call per scalar
+        bounds = np.round([base_min_x, base_max_x, base_min_y, base_max_y], 2).tolist()
         details = {
-            'center_of_mass': [round(c, 2) for c in com],
+            'center_of_mass': np.round(com, 2).tolist(),
             'base_bounds': {
-                'x_range': [round(base_min_x, 2), round(base_max_x, 2)],
-                'y_range': [round(base_min_y, 2), round(base_max_y, 2)],
+                'x_range': bounds[:2],
+                'y_range': bounds[2:],
             },
             'margin': round(min_margin, 2)
         }
-        
-        if is_stable_x and is_stable_y:
+        if hull is not None:
+            details['support_hull'] = hull.round(2).tolist()
+
+        if is_stable:
             return TestResult(
                 name="Static Stability",
                 status=TestStatus.PASSED,
@@ -861,15 +1539,57 @@ def test_static_stability(result: Any) -> TestResult:
         )
 
 
+# Completed suite results keyed by (code text, module names). Identical code
+# produces identical results, so re-running the suite for an unchanged script
+# (common while the frontend iterates on unrelated panels) is pure waste.
+# Bounded LRU; the cached TestSuiteResult is aliased, so treat it read-only.
+_SUITE_CACHE_SIZE = 32
+_suite_cache: "OrderedDict[tuple, TestSuiteResult]" = OrderedDict()
+
+# Display names of the geometry tests, in suite order
+_GEOMETRY_TEST_NAMES = (
+    "Parts in Library",
+    "No Part Intersections",
+    "Static Stability",
+    "Part Connectivity",
+)
+_EXEC_FAILED_SKIP_MSG = "Skipped because code execution failed"
+
+# Prototype exec environments keyed by id(cached_modules); the entry keeps
+# the modules dict alive so its id cannot be recycled while cached. The
+# builtins + modules merge happens once and each run pays only a flat copy.
+# Mutating the modules dict in place requires dropping its cache entry.
+_exec_proto_cache: Dict[int, tuple] = {}
+
+
 def run_test_suite(code: str, cached_modules: dict) -> TestSuiteResult:
     """Run the full test suite on the provided code."""
+    suite_key = (code, tuple(sorted(cached_modules)))
+    cached_suite = _suite_cache.get(suite_key)
+    if cached_suite is not None:
+        _suite_cache.move_to_end(suite_key)
+        return cached_suite
+
     tests: List[TestResult] = []
-    
-    # Create execution environment
-    exec_globals = {
-        "__builtins__": __builtins__,
-        **cached_modules,
-    }
+
+    # Invalidate per-suite caches; solid and location ids are only stable
+    # within a run
+    _solid_cache.clear()
+    _identity_locs.clear()
+
+
+    # Create execution environment from the cached prototype; exec mutates
+    # its globals, so each run gets a flat copy
+    cached_proto = _exec_proto_cache.get(id(cached_modules))
+    if cached_proto is None:
+        proto = {
+            "__builtins__": __builtins__,
+            **cached_modules,
+        }
+        _exec_proto_cache[id(cached_modules)] = (cached_modules, proto)
+    else:
+        proto = cached_proto[1]
+    exec_globals = proto.copy()
     
     # Test 1: Code execution
     exec_result = test_code_executes(code, exec_globals)
@@ -878,57 +1598,55 @@ def run_test_suite(code: str, cached_modules: dict) -> TestSuiteResult:
     # Test 2: Part constraints (only if code executed successfully)
     if exec_result.status == TestStatus.PASSED:
         result = exec_globals.get('result')
-        constraint_result = test_parts_in_library(result)
-        tests.append(constraint_result)
-        
-        # Test 3: Check for part intersections
-        intersection_result = test_no_intersections(result)
-        tests.append(intersection_result)
-        
-        # Test 4: Static Stability
-        stability_result = test_static_stability(result)
-        tests.append(stability_result)
-        
-        # Test 5: Part Connectivity
-        connectivity_result = test_connectivity(result)
-        tests.append(connectivity_result)
+
+        # Extract solids once; the assembly walk and location transforms are
+        # expensive and every geometry test consumes the same parts list
+        parts = _extract_solids(result)
+
+        # Tests 2-5 only read the shared parts list and spend most of their
+        # time inside GIL-releasing OCCT calls, so they overlap well on a
+        # small thread pool. Results keep the submission order, and a
+        # raising test is reported as an ERROR result instead of taking the
+        # whole suite down.
+        test_fns = list(zip(_GEOMETRY_TEST_NAMES, (
+            test_parts_in_library,
+            test_no_intersections,
+            test_static_stability,
+            test_connectivity,
+        )))
+
+        def run_one(entry: tuple) -> TestResult:
+            name, test_fn = entry
+            try:
+                return test_fn(parts)
+            except Exception as e:
+                logger.error(f"{name} test raised: {e}", exc_info=True)
+                return TestResult(
+                    name=name,
+                    status=TestStatus.ERROR,
+                    message=f"Error running test: {e}",
+                )
+
+        with ThreadPoolExecutor(max_workers=len(test_fns)) as executor:
+            tests.extend(executor.map(run_one, test_fns))
     else:
-        tests.append(TestResult(
-            name="Parts in Library",
-            status=TestStatus.SKIPPED,
-            message="Skipped because code execution failed",
-        ))
-        tests.append(TestResult(
-            name="No Part Intersections",
-            status=TestStatus.SKIPPED,
-            message="Skipped because code execution failed",
-        ))
-        tests.append(TestResult(
-            name="Static Stability",
-            status=TestStatus.SKIPPED,
-            message="Skipped because code execution failed",
-        ))
-        tests.append(TestResult(
-            name="Part Connectivity",
-            status=TestStatus.SKIPPED,
-            message="Skipped because code execution failed",
-        ))
-        tests.append(TestResult(
-            name="Part Connectivity",
-            status=TestStatus.SKIPPED,
-            message="Skipped because code execution failed",
-        ))
-    
-    # Count results
-    passed = sum(1 for t in tests if t.status == TestStatus.PASSED)
-    failed = sum(1 for t in tests if t.status == TestStatus.FAILED)
-    skipped = sum(1 for t in tests if t.status == TestStatus.SKIPPED)
-    errors = sum(1 for t in tests if t.status == TestStatus.ERROR)
+        tests.extend(
+            TestResult(name=name, status=TestStatus.SKIPPED, message=_EXEC_FAILED_SKIP_MSG)
+            for name in _GEOMETRY_TEST_NAMES
+        )
     
-    return TestSuiteResult(
-        passed=passed,
-        failed=failed,
-        skipped=skipped,
-        errors=errors,
+    # Count results in a single pass
+    counts = Counter(t.status for t in tests)
+
+    suite_result = TestSuiteResult(
+        passed=counts[TestStatus.PASSED],
+        failed=counts[TestStatus.FAILED],
+        skipped=counts[TestStatus.SKIPPED],
+        errors=counts[TestStatus.ERROR],
         tests=tests,
     )
+
+    _suite_cache[suite_key] = suite_result
+    if len(_suite_cache) > _SUITE_CACHE_SIZE:
+        _suite_cache.popitem(last=False)
+    return suite_result